@@ -1,5 +1,6 @@
 import pandas as pd
 import folium
+from mapbundle import save_map
 import matplotlib.cm as cm  # Import colormap from matplotlib
 
 # Step 1: Load CSV file into a pandas DataFrame
@@ -103,4 +104,4 @@ legend_html = '''
 m.get_root().html.add_child(folium.Element(legend_html))
 
 # Step 11: Save the map as an HTML file
-m.save('map_with_litter_and_graphiti_colored_with_legend.html')
+save_map(m, 'map_with_litter_and_graphiti_colored_with_legend.html')
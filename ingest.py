@@ -0,0 +1,138 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from p2coef import (
+    N_CLUSTERS, STATE_FILE, VALUE_COLUMNS,
+    fit_clusters, load_state, prepare, save_state, state_lock, write_aggregates,
+)
+
+OBSERVATIONS_FILE = 'tdtour.csv'
+
+# Refit once new points sit this many times further (in mean squared
+# distance) from their centroids than the points of the last fit did.
+# This is a loose heuristic: small batches are noisy (re-ingesting 5 rows
+# that were part of the fit scores about 3.4) and one far-off point can be
+# enough to trigger a refit, while rows from new streets score over 100.
+DRIFT_THRESHOLD = 5.0
+
+
+# Batch columns must be named like pd.read_csv('tdtour.csv').columns, so the
+# duplicated headers are 's.1', 's.2', 'd.1' and 's.3'. Value columns the
+# batch lacks (e.g. a decibel-only reading) are left empty.
+def read_batch(path):
+    if path.endswith(('.jsonl', '.ndjson')):
+        batch = pd.read_json(path, lines=True)
+    else:
+        batch = pd.read_csv(path)
+    missing = [col for col in VALUE_COLUMNS if col not in batch.columns]
+    return batch.reindex(columns=list(batch.columns) + missing)
+
+
+# Append the raw rows to the observations file, in its column order
+def append_observations(batch, path=OBSERVATIONS_FILE):
+    columns = pd.read_csv(path, nrows=0).columns
+    ignored = [col for col in batch.columns if col not in columns]
+    if ignored:
+        print(f"Ignoring columns not in {path}: {', '.join(map(str, ignored))}")
+    with open(path, 'rb') as f:
+        f.seek(-1, os.SEEK_END)
+        needs_newline = f.read(1) != b'\n'
+    with open(path, 'a', newline='') as f:
+        if needs_newline:
+            f.write('\n')
+        # '%.15g' keeps coordinates exact and writes 0 rather than 0.0
+        batch.reindex(columns=columns).to_csv(f, header=False, index=False, float_format='%.15g')
+
+
+# Nearest existing centroid for every point, and its squared distance
+def assign_clusters(state, batch):
+    centroids = np.array(state['centroids'])
+    coordinates = batch[['latitude', 'longitude']].values
+    sq_dist = ((coordinates[:, None, :] - centroids[None, :, :]) ** 2).sum(axis=2)
+    return sq_dist.argmin(axis=1), sq_dist.min(axis=1)
+
+
+# Fold the batch into the per-cluster running means and counts
+def update_aggregates(state, batch, clusters):
+    batch = prepare(batch)
+    for col in VALUE_COLUMNS:
+        new = batch[col].groupby(clusters).agg(['count', 'sum'])
+        new = new.reindex(range(N_CLUSTERS), fill_value=0)
+        counts = state['counts'][col]
+        means = state['means'][col]
+        for k, (n_new, total) in enumerate(zip(new['count'], new['sum'])):
+            if n_new == 0:
+                continue
+            n = counts[k]
+            mean = means[k] if means[k] is not None else 0.0
+            counts[k] = n + int(n_new)
+            means[k] = (n * mean + float(total)) / counts[k]
+
+
+def drift(state):
+    if state['drift_count'] == 0 or state['drift_sq_dist'] == 0:
+        return 0.0
+    # The last fit had every point on a centroid, so any distance is drift
+    if state['baseline_sq_dist'] == 0:
+        return float('inf')
+    return state['drift_sq_dist'] / state['drift_count'] / state['baseline_sq_dist']
+
+
+# Existing observations plus the batch, for a full refit
+def all_observations(existing, batch):
+    return pd.concat([existing[VALUE_COLUMNS], batch[VALUE_COLUMNS]], ignore_index=True)
+
+
+def ingest(path, threshold=DRIFT_THRESHOLD):
+    batch = read_batch(path)
+    missing = batch[['latitude', 'longitude']].isna().any(axis=1)
+    if missing.any():
+        print(f"Skipping {missing.sum()} rows without coordinates")
+        batch = batch[~missing]
+    if batch.empty:
+        return
+
+    with state_lock():
+        existing = pd.read_csv(OBSERVATIONS_FILE)
+        state = load_state() if os.path.exists(STATE_FILE) else None
+
+        # tdtour.csv is the source of truth: if an earlier run died between
+        # appending and saving the state, start over from the full file
+        if state is not None and state.get('observations') != len(existing):
+            print(f"{STATE_FILE} covers {state.get('observations')} rows but "
+                  f"{OBSERVATIONS_FILE} has {len(existing)}, refitting clusters")
+            state = None
+
+        # Work out the new state before touching any file, so a failing batch
+        # leaves everything as it was
+        if state is None:
+            state = fit_clusters(all_observations(existing, batch))
+        else:
+            clusters, sq_dist = assign_clusters(state, batch)
+            update_aggregates(state, batch, clusters)
+            state['drift_sq_dist'] += float(sq_dist.sum())
+            state['drift_count'] += len(batch)
+            state['observations'] += len(batch)
+
+            # Only refit when the new points no longer match the old clusters
+            if drift(state) > threshold:
+                print(f"Drift {drift(state):.2f} above {threshold}, refitting clusters")
+                state = fit_clusters(all_observations(existing, batch))
+
+        append_observations(batch)
+        write_aggregates(state)
+        save_state(state)
+    print(f"Ingested {len(batch)} rows from {path}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Add new survey observations to the cluster aggregates')
+    parser.add_argument('batches', nargs='+', help='CSV or JSON Lines files with new observations')
+    parser.add_argument('--drift-threshold', type=float, default=DRIFT_THRESHOLD)
+    args = parser.parse_args()
+
+    for path in args.batches:
+        ingest(path, args.drift_threshold)
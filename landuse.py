@@ -1,5 +1,6 @@
 import pandas as pd
 import folium
+from mapbundle import save_map
 
 # Step 1: Load the CSV file into a DataFrame
 data = pd.read_csv("land.csv")
@@ -104,36 +105,19 @@ folium.Marker(
 ).add_to(m)
 
 
-legend_html = """
-    <div style="position: fixed; bottom: 10vh; left: 5vw; width: 20vw; height: 80vh; background-color: white; z-index: 9999; border: 0.5vw black; padding: 1vw; font-size: 0.8vw; overflow-y: auto;">
+# Build the legend from the same mapping used for the markers
+legend_rows = "".join(
+    f'<div class="swatch" style="background-color: {entry["color"]};"></div> {entry["category"]}<br>\n'
+    for entry in land_use_mapping.values()
+)
+legend_html = f"""
+    <style>
+        .land-use-legend {{position: fixed; bottom: 10vh; left: 5vw; width: 20vw; height: 80vh; background-color: white; z-index: 9999; border: 0.5vw black; padding: 1vw; font-size: 0.8vw; overflow-y: auto;}}
+        .land-use-legend .swatch {{width: 20px; height: 20px; float: left; margin-right: 5px;}}
+    </style>
+    <div class="land-use-legend">
         <b>Land Use Legend</b><br>
-        <div style="background-color: #ff7d7d; width: 20px; height: 20px; float: left; margin-right: 5px;"></div> Residential - Apartment<br>
-        <div style="background-color: #db896a; width: 20px; height: 20px; float: left; margin-right: 5px;"></div> Residential - Semi-detached<br>
-        <div style="background-color: #ff66c4; width: 20px; height: 20px; float: left; margin-right: 5px;"></div> Residential - Detached<br>
-        <div style="background-color: #ff0000; width: 20px; height: 20px; float: left; margin-right: 5px;"></div> Residential - Townhouse<br>
-        <div style="background-color: #5ce1e6; width: 20px; height: 20px; float: left; margin-right: 5px;"></div> Commercial - Fast Food<br>
-        <div style="background-color: #38b6ff; width: 20px; height: 20px; float: left; margin-right: 5px;"></div> Commercial - Personal Services<br>
-        <div style="background-color: #5F9EA0; width: 20px; height: 20px; float: left; margin-right: 5px;"></div> Commercial - Market<br>
-        <div style="background-color: #1E90FF; width: 20px; height: 20px; float: left; margin-right: 5px;"></div> Commercial - Specialty Shop<br>
-        <div style="background-color: #00BFFF; width: 20px; height: 20px; float: left; margin-right: 5px;"></div> Commercial - Office<br>
-        <div style="background-color: #87CEEB; width: 20px; height: 20px; float: left; margin-right: 5px;"></div> Commercial - Vacant<br>
-        <div style="background-color: #D8BFD8; width: 20px; height: 20px; float: left; margin-right: 5px;"></div> Entertainment - Hotel<br>
-        <div style="background-color: #8A2BE2; width: 20px; height: 20px; float: left; margin-right: 5px;"></div> Entertainment - Cinema<br>
-        <div style="background-color: #800080; width: 20px; height: 20px; float: left; margin-right: 5px;"></div> Entertainment - Bar<br>
-        <div style="background-color: #9932CC; width: 20px; height: 20px; float: left; margin-right: 5px;"></div> Entertainment - Restaurant<br>
-        <div style="background-color: #4B0082; width: 20px; height: 20px; float: left; margin-right: 5px;"></div> Entertainment - Sports Center<br>
-        <div style="background-color: #FFA500; width: 20px; height: 20px; float: left; margin-right: 5px;"></div> Public Building - Education<br>
-        <div style="background-color: #FF8C00; width: 20px; height: 20px; float: left; margin-right: 5px;"></div> Public Building - Library<br>
-        <div style="background-color: #FF7F50; width: 20px; height: 20px; float: left; margin-right: 5px;"></div> Public Building - Place of Worship<br>
-        <div style="background-color: #32CD32; width: 20px; height: 20px; float: left; margin-right: 5px;"></div> Open Space - Park<br>
-        <div style="background-color: #228B22; width: 20px; height: 20px; float: left; margin-right: 5px;"></div> Open Space - Sports Field<br>
-        <div style="background-color: #006400; width: 20px; height: 20px; float: left; margin-right: 5px;"></div> Open Space - Unused Land<br>
-        <div style="background-color: #2E8B57; width: 20px; height: 20px; float: left; margin-right: 5px;"></div> Open Space - Derelict Building<br>
-        <div style="background-color: #8B4513; width: 20px; height: 20px; float: left; margin-right: 5px;"></div> Transport - Bus Stop<br>
-        <div style="background-color: #A52A2A; width: 20px; height: 20px; float: left; margin-right: 5px;"></div> Transport - Car Park<br>
-        <div style="background-color: #00008B; width: 20px; height: 20px; float: left; margin-right: 5px;"></div> Services - Financial<br>
-        <div style="background-color: #000080; width: 20px; height: 20px; float: left; margin-right: 5px;"></div> Services - Medical<br>
-        <div style="background-color: #191970; width: 20px; height: 20px; float: left; margin-right: 5px;"></div> Services - Business<br>
+        {legend_rows}
     </div>
 """
 
@@ -142,6 +126,6 @@ legend_html = """
 m.get_root().html.add_child(folium.Element(legend_html))
 
 # Step 8: Save the map to an HTML file
-m.save("land_use_map_with_offsets.html")
+save_map(m, "land_use_map_with_offsets.html")
 
 print("Map has been saved to 'land_use_map.html'.")
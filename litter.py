@@ -1,5 +1,6 @@
 import pandas as pd
 import folium
+from mapbundle import save_map
 import matplotlib.cm as cm  # Import colormap from matplotlib
 
 # Step 1: Load CSV file into a pandas DataFrame
@@ -46,4 +47,4 @@ for idx, row in data.iterrows():
     ).add_to(m)
 
 # Step 8: Save the map as an HTML file
-m.save('map_with_eqi_shades_of_green.html')
+save_map(m, 'map_with_eqi_shades_of_green.html')
@@ -0,0 +1,182 @@
+import gzip
+import hashlib
+import os
+import re
+import sys
+import urllib.error
+import urllib.parse
+import urllib.request
+
+import folium
+
+try:
+    import brotli  # Optional: only needed for the .br variants
+except ImportError:
+    brotli = None
+
+# All bundled maps are written here, next to one shared asset directory
+BUNDLE_DIR = 'site'
+
+# The CDN URLs folium emits are pinned by the folium release, so the asset
+# directory is versioned by it and can be cached forever by the viewers
+ASSET_VERSION = f'folium-{folium.__version__}'
+
+# File types worth precompressing (fonts like .woff2 are already compressed)
+COMPRESSIBLE = ('.html', '.js', '.css', '.svg', '.ttf', '.eot', '.json')
+
+EXTERNAL_ASSET = re.compile(r'(<script src=|<link rel="stylesheet" href=)"(https?://[^"]+)"')
+CSS_URL = re.compile(r'url\(\s*[\'"]?([^\'")]+)[\'"]?\s*\)')
+INLINE_SCRIPT = re.compile(r'<script>(.*?)</script>', re.S)
+
+# Give up on a CDN that does not answer, e.g. a network that drops packets
+DOWNLOAD_TIMEOUT = 10
+
+warned_no_brotli = False
+# Set after the first connection failure so the rest of the run skips the network
+offline = False
+
+
+# Save the map as usual, or as a bundled page when run with --bundle
+def save_map(m, filename, bundle=None):
+    if bundle is None:
+        bundle = '--bundle' in sys.argv
+    if bundle:
+        return save_bundled(m, filename)
+    m.save(filename)
+    return filename
+
+
+# Mirror a CDN URL into the asset directory, keeping its host/path layout so
+# that relative references inside stylesheets (fonts, images) still resolve
+def local_asset_path(url, asset_dir):
+    parts = urllib.parse.urlsplit(url)
+    return os.path.join(asset_dir, parts.netloc, *parts.path.lstrip('/').split('/'))
+
+
+def download(url, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with urllib.request.urlopen(url, timeout=DOWNLOAD_TIMEOUT) as response:
+        content = response.read()
+    with open(path, 'wb') as f:
+        f.write(content)
+
+
+# Make sure an asset is on disk, downloading it if needed. Without internet
+# access the files can be copied into the asset directory by hand.
+def fetch_asset(url, path):
+    global offline
+    if not os.path.exists(path):
+        if offline:
+            print(f"Missing {url} (copy it to '{path}')")
+            return False
+        try:
+            download(url, path)
+        except OSError as e:
+            # A 404 is specific to this file, anything else means no network
+            if not isinstance(e, urllib.error.HTTPError):
+                offline = True
+            print(f"Could not vendor {url}: {e} (copy it to '{path}')")
+            return False
+    precompress(path, only_if_stale=True)
+    return True
+
+
+# Vendor an asset plus whatever its stylesheet points to. Stylesheets are
+# scanned on every run so that hand-copied ones still get their fonts/images.
+def vendor_asset(url, asset_dir):
+    path = local_asset_path(url, asset_dir)
+    if not fetch_asset(url, path) or not path.endswith('.css'):
+        return path
+
+    with open(path, encoding='utf-8') as f:
+        css = f.read()
+    for ref in sorted(set(CSS_URL.findall(css))):
+        if ref.startswith(('data:', 'http:', 'https:', '//', '#')):
+            continue
+        ref_url = urllib.parse.urljoin(url, ref.split('#')[0].split('?')[0])
+        fetch_asset(ref_url, local_asset_path(ref_url, asset_dir))
+    return path
+
+
+def is_stale(variant, path):
+    return not os.path.exists(variant) or os.path.getmtime(variant) < os.path.getmtime(path)
+
+
+# Write .gz and .br siblings so a static server can send them as-is
+def precompress(path, only_if_stale=False):
+    global warned_no_brotli
+    if not path.endswith(COMPRESSIBLE):
+        return
+
+    if brotli is None:
+        # Never leave an old .br next to newer content
+        if os.path.exists(path + '.br'):
+            os.remove(path + '.br')
+        if not warned_no_brotli:
+            print("brotli is not installed, only writing .gz files (pip install brotli)")
+            warned_no_brotli = True
+
+    stale = ['.gz'] if brotli is None else ['.gz', '.br']
+    if only_if_stale:
+        stale = [v for v in stale if is_stale(path + v, path)]
+    if not stale:
+        return
+
+    with open(path, 'rb') as f:
+        content = f.read()
+    if '.gz' in stale:
+        with open(path + '.gz', 'wb') as f:
+            f.write(gzip.compress(content, compresslevel=9, mtime=0))
+    if '.br' in stale:
+        with open(path + '.br', 'wb') as f:
+            f.write(brotli.compress(content, quality=11))
+
+
+# Drop indentation and blank lines from the generated map script
+def compact_script(script):
+    lines = (line.strip() for line in script.splitlines())
+    return '\n'.join(line for line in lines if line) + '\n'
+
+
+def save_bundled(m, filename, bundle_dir=BUNDLE_DIR):
+    asset_dir = os.path.join(bundle_dir, 'assets', ASSET_VERSION)
+    name = os.path.splitext(os.path.basename(filename))[0]
+    os.makedirs(bundle_dir, exist_ok=True)
+
+    html = m.get_root().render()
+
+    # Step 1: Point Leaflet/Bootstrap/jQuery/etc. at the shared local copies
+    def use_local_asset(match):
+        path = vendor_asset(match.group(2), asset_dir)
+        return f'{match.group(1)}"{os.path.relpath(path, bundle_dir).replace(os.sep, "/")}"'
+
+    html = EXTERNAL_ASSET.sub(use_local_asset, html)
+
+    # Step 2: Move the per-map data (the script after </body>) into its own
+    # file. Folium element ids change on every render, so the file is named by
+    # its content and a cached page can never load another render's data.
+    head, body_end, tail = html.partition('</body>')
+    scripts = INLINE_SCRIPT.findall(tail)
+    data_file = None
+    if scripts:
+        script = compact_script('\n'.join(scripts))
+        data_file = f'{name}.{hashlib.sha256(script.encode()).hexdigest()[:10]}.js'
+        with open(os.path.join(bundle_dir, data_file), 'w', encoding='utf-8') as f:
+            f.write(script)
+        tail = INLINE_SCRIPT.sub('', tail).replace('</html>', f'<script src="{data_file}"></script>\n</html>')
+        precompress(os.path.join(bundle_dir, data_file))
+
+    # Step 3: Save the page itself and its compressed variants
+    page = os.path.join(bundle_dir, f'{name}.html')
+    with open(page, 'w', encoding='utf-8') as f:
+        f.write(head + body_end + tail)
+    precompress(page)
+
+    # Step 4: Remove the data files of earlier renders of this map
+    old_data = re.compile(re.escape(name) + r'(\.[0-9a-f]{10})?\.js(\.gz|\.br)?')
+    for old in os.listdir(bundle_dir):
+        if old_data.fullmatch(old) and not (data_file and old.startswith(data_file)):
+            os.remove(os.path.join(bundle_dir, old))
+
+    print(f"Bundled map saved to '{page}' (assets in '{asset_dir}')")
+    return page
@@ -1,38 +1,115 @@
+import contextlib
+import fcntl
+import json
+import os
+
 import pandas as pd
 import numpy as np
 from sklearn.cluster import DBSCAN, KMeans
 
-# Step 1: Load the data
-data = pd.read_csv('tdtour.csv')  # Replace with your CSV file name
+N_CLUSTERS = 10
+
+# Centroids and per-cluster running means, kept so ingest.py can update the
+# aggregates without refitting
+STATE_FILE = 'cluster_state.json'
+
+# Every output pairs the pedestrian average (x) with one other reading (y)
+OUTPUTS = {
+    'deciTD.csv': 'deci_avg',
+    'trafTD.csv': 'traff_avg',
+}
+VALUE_COLUMNS = ['latitude', 'longitude', 'ped_avg', 'deci_avg', 'traff_avg']
+
+
+# A reading of 0 means nothing was recorded
+def prepare(data):
+    data = data.copy()
+    for col in ['ped_avg', 'deci_avg', 'traff_avg']:
+        data[col] = data[col].replace(0, np.nan)
+    return data
+
+
+def fit_clusters(data):
+    data = prepare(data)
+
+    # Use k-means clustering to create exactly 10 clusters
+    coordinates = data[['latitude', 'longitude']].values
+    kmeans = KMeans(n_clusters=N_CLUSTERS, random_state=42)
+    data['cluster'] = kmeans.fit_predict(coordinates)
+
+    # Count and average every value within each cluster (NaNs are skipped)
+    grouped = data.groupby('cluster')[VALUE_COLUMNS]
+    counts = grouped.count().reindex(range(N_CLUSTERS), fill_value=0)
+    means = grouped.mean().reindex(range(N_CLUSTERS))
+
+    return {
+        'centroids': kmeans.cluster_centers_.tolist(),
+        # Mean squared distance of a point to its centroid at fit time
+        'baseline_sq_dist': kmeans.inertia_ / len(data),
+        'drift_sq_dist': 0.0,
+        'drift_count': 0,
+        # Rows of tdtour.csv this state covers, checked before every ingest
+        'observations': len(data),
+        'counts': {col: counts[col].astype(int).tolist() for col in VALUE_COLUMNS},
+        'means': {col: [None if pd.isna(v) else float(v) for v in means[col]] for col in VALUE_COLUMNS},
+    }
+
+
+# Held while reading tdtour.csv and writing the state, so that two runs
+# (e.g. ingests of batches arriving together) cannot overwrite each other
+@contextlib.contextmanager
+def state_lock(path=STATE_FILE):
+    with open(path + '.lock', 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def load_state(path=STATE_FILE):
+    with open(path) as f:
+        return json.load(f)
+
+
+# Write to a temporary file and rename it, so readers never see a half file
+def save_state(state, path=STATE_FILE):
+    with open(path + '.tmp', 'w') as f:
+        json.dump(state, f, indent=1)
+    os.replace(path + '.tmp', path)
+
 
-# Rename columns for clarity
-data = data.rename(columns={'ped_avg': 'x', 'deci_avg': 'y'})
+def aggregate(state, value):
+    aggregated = pd.DataFrame({
+        'cluster': range(N_CLUSTERS),
+        'latitude': state['means']['latitude'],
+        'longitude': state['means']['longitude'],
+        'x': state['means']['ped_avg'],
+        'y': state['means'][value],
+    }, dtype=float)
+    aggregated['cluster'] = aggregated['cluster'].astype(int)
 
-data['x'] = data['x'].replace(0, np.nan)
-data['y'] = data['y'].replace(0, np.nan)
+    # Drop empty clusters and clusters where both `x` and `y` are NaN
+    aggregated = aggregated[np.array(state['counts']['latitude']) > 0]
+    return aggregated.dropna(subset=['x', 'y'], how='all')
 
-# Step 2: Prepare coordinates
-coordinates = data[['latitude', 'longitude']].values
 
-# Use k-means clustering to create exactly 10 clusters
-kmeans = KMeans(n_clusters=10, random_state=42)
-clusters = kmeans.fit_predict(coordinates)
+def write_aggregates(state):
+    for filename, value in OUTPUTS.items():
+        aggregated = aggregate(state, value)
+        print(aggregated)
+        aggregated.to_csv(filename + '.tmp', index=False)
+        os.replace(filename + '.tmp', filename)
 
-# Add cluster labels
-data['cluster'] = clusters
 
-# Aggregate `x` and `y` values within each cluster
-grouped = data.groupby('cluster')
-aggregated = grouped.agg({
-    'latitude': 'mean',
-    'longitude': 'mean',
-    'x': 'mean',
-    'y': 'mean'
-}).reset_index()
+if __name__ == '__main__':
+    with state_lock():
+        # Step 1: Load the data
+        data = pd.read_csv('tdtour.csv')  # Replace with your CSV file name
 
-# Drop clusters where both `x` and `y` are NaN
-aggregated = aggregated.dropna(subset=['x', 'y'], how='all')
-print(aggregated)
+        # Step 2: Cluster the coordinates and aggregate `x` and `y` per cluster
+        state = fit_clusters(data)
 
-# Optional: Save the results
-aggregated.to_csv('deciTD.csv', index=False)
+        # Step 3: Save the results and the state used for incremental updates
+        write_aggregates(state)
+        save_state(state)
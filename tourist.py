@@ -1,5 +1,6 @@
 import pandas as pd
 import folium
+from mapbundle import save_map
 import numpy as np  # For better normalization
 
 # Step 1: Load CSV file into a pandas DataFrame
@@ -161,4 +162,4 @@ legend_html = f'''
 m.get_root().html.add_child(folium.Element(legend_html))
 
 # Step 11: Save the map as an HTML file
-m.save('tourism_map_with_legend.html')
+save_map(m, 'tourism_map_with_legend.html')